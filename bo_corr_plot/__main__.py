@@ -1,13 +1,35 @@
+import argparse
 import sys
+from multiprocessing.connection import AuthenticationError
 from PyQt5.QtWidgets import QApplication
 import qdarkstyle
-from .core.process import BOController
+from .core.process import BOController, RemoteBOController
+from .service.protocol import DEFAULT_ADDRESS
 
 def main():
     """Main function to launch the GUI."""
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Bae: A Bayesian Optimization GUI")
+    parser.add_argument(
+        "--connect", nargs="?", const=DEFAULT_ADDRESS, metavar="ADDRESS",
+        help="Run as a client of the optimization service (bae-server) at ADDRESS "
+             f"(Unix socket path or loopback host:port, default: {DEFAULT_ADDRESS})"
+    )
+    parser.add_argument(
+        "--read-only", action="store_true",
+        help="With --connect, only watch the service's runs"
+    )
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyleSheet(qdarkstyle.load_stylesheet(qt_api='pyqt5'))
-    controller = BOController()
+    if args.connect:
+        try:
+            controller = RemoteBOController(args.connect, read_only=args.read_only)
+        except (AuthenticationError, OSError, ValueError) as e:
+            print(f"Could not connect to the optimization service at {args.connect}: {e}")
+            sys.exit(1)
+    else:
+        controller = BOController()
     controller.window.resize(1200, 800)
     controller.window.show()
     sys.exit(app.exec_())
@@ -1,13 +1,29 @@
 # bo_corr_plot/core/bo.py
+import numpy as np
 import torch
+import gpytorch
+from gpytorch.constraints import GreaterThan
+from gpytorch.likelihoods.gaussian_likelihood import _GaussianLikelihoodBase
+from gpytorch.likelihoods.noise_models import Noise
+from linear_operator.operators import DiagLinearOperator
 from botorch.optim import optimize_acqf
+from botorch.acquisition import AcquisitionFunction, PosteriorMean, FixedFeatureAcquisitionFunction
+from botorch.acquisition.analytic import ConstrainedExpectedImprovement
+from botorch.acquisition.cost_aware import InverseCostWeightedUtility
+from botorch.acquisition.knowledge_gradient import qMultiFidelityKnowledgeGradient
+from botorch.acquisition.multi_objective.monte_carlo import qNoisyExpectedHypervolumeImprovement
+from botorch.acquisition.multi_objective.objective import IdentityMCMultiOutputObjective
+from botorch.models.cost import AffineFidelityCostModel
+from botorch.utils.multi_objective.pareto import is_non_dominated
 
-def propose_location_botorch(self, acq_fn):
+def propose_location_botorch(self, acq_fn, bounds=None):
     """
     Return the next best location to sample using BoTorch's optimize_acqf.
-    `self` is the BOController instance.
+    `self` is the BOEngine instance. `bounds` overrides `self.bounds`
+    (e.g. with the current trust region).
     """
-    bounds_torch = torch.tensor(self.bounds, dtype=torch.float).T  # shape: (2,1)
+    bounds = self.bounds if bounds is None else bounds
+    bounds_torch = torch.tensor(bounds, dtype=self.dtype).T  # shape: (2,d)
     candidate, _ = optimize_acqf(
         acq_function=acq_fn,
         bounds=bounds_torch,
@@ -15,4 +31,251 @@ def propose_location_botorch(self, acq_fn):
         num_restarts=10,
         raw_samples=50,
     )
-    return candidate.detach()
\ No newline at end of file
+    return candidate.detach()
+
+class TravelPenalizedAcquisition(AcquisitionFunction):
+    """
+    Wrap an acquisition function and subtract a travel cost proportional to
+    the distance of each candidate from the current actuator setpoint:
+
+        acq(X) - scale * sum_i weights[i] * |X_i - current_x_i| / (ub_i - lb_i)
+
+    `weights` holds one weight per input PV. With `scale` set to the spread
+    of the observed objective, a weight of 1 means a move across the full
+    range costs as much as one standard deviation of the objective.
+    """
+
+    def __init__(self, acq_fn, current_x, bounds, weights, scale=1.0, dtype=torch.float):
+        super().__init__(model=acq_fn.model)
+        self.acq_fn = acq_fn
+        bounds = torch.as_tensor(bounds, dtype=dtype)  # shape (d, 2)
+        self.register_buffer("current_x", torch.as_tensor(current_x, dtype=dtype).reshape(-1))
+        self.register_buffer("width", bounds[:, 1] - bounds[:, 0])
+        self.register_buffer("weights", torch.as_tensor(weights, dtype=dtype).reshape(-1))
+        self.scale = scale
+
+    def forward(self, X):
+        # X: batch_shape x q x d
+        distance = ((X - self.current_x).abs() / self.width * self.weights).sum(dim=-1)
+        return self.acq_fn(X) - self.scale * distance.sum(dim=-1)
+
+def order_by_travel(X, start):
+    """
+    Order a batch of points (shape (n, d)) as a greedy nearest-neighbour
+    route starting from `start`, so consecutive moves stay short.
+    """
+    remaining = list(range(len(X)))
+    position = np.asarray(start, dtype=float).reshape(-1)
+    order = []
+    while remaining:
+        distances = [np.abs(X[i] - position).sum() for i in remaining]
+        nearest = remaining.pop(int(np.argmin(distances)))
+        order.append(nearest)
+        position = X[nearest]
+    return X[order]
+
+def predict_grid(model, X_grid, chunk_size=1024):
+    """
+    Return the posterior mean and standard deviation of `model` on the
+    evaluation grid, of shape (n,) for one output or (n, m) for m outputs.
+    Variances use LOVE (`fast_pred_var`), whose cache is stored on the
+    model and reused by later calls with the same model. The grid is
+    evaluated `chunk_size` points at a time, since multi-output posteriors
+    build their joint covariance over all points.
+    """
+    model.eval()
+    means, stds = [], []
+    with torch.no_grad(), gpytorch.settings.fast_pred_var():
+        for X in X_grid.split(chunk_size):
+            posterior = model.posterior(X)
+            means.append(posterior.mean.squeeze(-1))
+            stds.append(posterior.variance.clamp_min(0.0).sqrt().squeeze(-1))
+    return torch.cat(means), torch.cat(stds)
+
+def evaluate_acquisition(acq_fn, X_grid, chunk_size=256):
+    """
+    Evaluate `acq_fn` at each grid point (q=1), `chunk_size` points at a
+    time so MC acquisitions such as qNEHVI stay within memory on large grids.
+    """
+    with torch.no_grad():
+        values = [acq_fn(X.unsqueeze(-2)) for X in X_grid.split(chunk_size)]
+    return torch.cat(values)
+
+def grid_acquisition(mean, std, best_f, beta, use_ei):
+    """
+    Analytic EI (at `best_f`) or UCB (with `beta`) from a precomputed
+    posterior mean/std, matching BoTorch's ExpectedImprovement and
+    UpperConfidenceBound. A few vectorized operations over the whole grid,
+    so the posterior is not evaluated again for the plot.
+    """
+    if use_ei:
+        sigma = std.clamp_min(1e-9)
+        u = (mean - best_f) / sigma
+        pdf = torch.exp(-0.5 * u * u) * 0.3989422804014327  # 1 / sqrt(2 pi)
+        cdf = 0.5 * (1.0 + torch.erf(u * 0.7071067811865476))  # 1 / sqrt(2)
+        return sigma * (pdf + u * cdf)
+    return mean + (beta ** 0.5) * std
+
+class SettleNoise(Noise):
+    """
+    Observation noise whose variance grows as the settle shortens:
+
+        noise(s) = base + settle / s
+
+    for the settle fraction s in input column `fidelity_col`. `base` and
+    `settle` are fitted with the GP, so the model learns how much noisier a
+    short-settle reading is.
+    """
+
+    def __init__(self, fidelity_col, min_fraction=1e-3):
+        super().__init__()
+        self.fidelity_col = fidelity_col
+        self.min_fraction = min_fraction
+        self.register_parameter("raw_base", torch.nn.Parameter(torch.zeros(1)))
+        self.register_parameter("raw_settle", torch.nn.Parameter(torch.zeros(1)))
+        self.register_constraint("raw_base", GreaterThan(1e-4))
+        self.register_constraint("raw_settle", GreaterThan(1e-4))
+
+    def forward(self, *params, shape=None, **kwargs):
+        X = params[0] if torch.is_tensor(params[0]) else params[0][0]
+        settle_fraction = X[..., self.fidelity_col].clamp_min(self.min_fraction)
+        base = self.raw_base_constraint.transform(self.raw_base)
+        settle = self.raw_settle_constraint.transform(self.raw_settle)
+        return DiagLinearOperator(base + settle / settle_fraction)
+
+def get_settle_likelihood(fidelity_col):
+    """
+    Return a Gaussian likelihood with SettleNoise on the settle-fraction column.
+    """
+    return _GaussianLikelihoodBase(noise_covar=SettleNoise(fidelity_col))
+
+def fit_settle_cost_model(settle_times, elapsed_times, min_fixed_cost=1e-3):
+    """
+    Fit elapsed = fixed_cost + slope * settle_time to the measured evaluation
+    times by least squares. Falls back to slope = 1 (pure sleep) while fewer
+    than two distinct settle times have been observed.
+    Returns (fixed_cost, slope) in seconds and seconds per second of settle.
+    """
+    settle_times = np.asarray(settle_times, dtype=float).reshape(-1)
+    elapsed_times = np.asarray(elapsed_times, dtype=float).reshape(-1)
+    if len(np.unique(np.round(settle_times, 6))) >= 2:
+        slope, fixed_cost = np.polyfit(settle_times, elapsed_times, 1)
+        slope = max(slope, 0.0)
+    else:
+        slope = 1.0
+        fixed_cost = np.mean(elapsed_times - settle_times) if len(elapsed_times) else 0.0
+    return max(fixed_cost, min_fixed_cost), slope
+
+def get_multifidelity_acquisition(self, num_fantasies=32):
+    """
+    Build a cost-aware multi-fidelity knowledge-gradient acquisition.
+    The last input column of the model is the settle fidelity (fraction of
+    `self.wait_time`); the target fidelity is a full settle (1.0). The value
+    of information is divided by the cost predicted from the measured settle
+    times, so the optimizer maximizes information per second.
+    `self` is the BOEngine instance.
+    """
+    fidelity_col = self.bounds.shape[0]
+
+    def project(X):
+        # Project candidates to the target fidelity (full settle)
+        X_full = X.clone()
+        X_full[..., fidelity_col] = 1.0
+        return X_full
+
+    fixed_cost, slope = fit_settle_cost_model(self.settle_samples, self.elapsed_samples)
+    self.settle_cost = (fixed_cost, slope)
+    cost_model = AffineFidelityCostModel(
+        fidelity_weights={fidelity_col: slope * self.wait_time},
+        fixed_cost=fixed_cost,
+    )
+    cost_aware_utility = InverseCostWeightedUtility(cost_model=cost_model)
+
+    # Best posterior mean at the target fidelity, used as the KG baseline
+    curr_val_acqf = FixedFeatureAcquisitionFunction(
+        acq_function=PosteriorMean(self.model),
+        d=fidelity_col + 1,
+        columns=[fidelity_col],
+        values=[1.0],
+    )
+    _, current_value = optimize_acqf(
+        acq_function=curr_val_acqf,
+        bounds=torch.tensor(self.bounds, dtype=self.dtype).T,
+        q=1,
+        num_restarts=10,
+        raw_samples=50,
+    )
+
+    return qMultiFidelityKnowledgeGradient(
+        model=self.model,
+        num_fantasies=num_fantasies,
+        current_value=current_value,
+        cost_aware_utility=cost_aware_utility,
+        project=project,
+    )
+
+def get_constraint_callables(n_objectives, constraints):
+    """
+    Turn (op, bound) constraints on model outputs n_objectives, n_objectives + 1, ...
+    into BoTorch outcome constraints (feasible where the callable is <= 0).
+    """
+    callables = []
+    for j, (op, bound) in enumerate(constraints):
+        idx = n_objectives + j
+        if op == "<":
+            callables.append(lambda Z, idx=idx, bound=bound: Z[..., idx] - bound)
+        else:
+            callables.append(lambda Z, idx=idx, bound=bound: bound - Z[..., idx])
+    return callables
+
+def get_feasible_mask(Y, n_objectives, constraints):
+    """
+    Return a boolean mask of the observations (rows of Y) meeting every constraint.
+    """
+    feasible = np.ones(len(Y), dtype=bool)
+    for j, (op, bound) in enumerate(constraints):
+        values = Y[:, n_objectives + j]
+        feasible &= values <= bound if op == "<" else values >= bound
+    return feasible
+
+def get_pareto_mask(Y_objectives):
+    """
+    Return a boolean mask of the non-dominated rows of Y_objectives (maximization).
+    """
+    return is_non_dominated(torch.as_tensor(Y_objectives)).numpy()
+
+def get_multioutput_acquisition(self):
+    """
+    Build the acquisition for several objective/constraint outputs:
+    qNEHVI over the objectives (with outcome constraints) when there are
+    several objectives, constrained EI for one objective with constraints.
+    The model's outputs are the objectives (maximized) followed by the
+    constraint PV readings. `self` is the BOEngine instance.
+    """
+    n_objectives = len(self.objective_pvs)
+    Y = self.store.Y
+    feasible = get_feasible_mask(Y, n_objectives, self.constraints)
+
+    if n_objectives == 1:
+        # Best feasible value so far (or the worst value if nothing is feasible)
+        best_f = float(Y[feasible, 0].max()) if feasible.any() else float(Y[:, 0].min())
+        bounds = {
+            n_objectives + j: (None, bound) if op == "<" else (bound, None)
+            for j, (op, bound) in enumerate(self.constraints)
+        }
+        return ConstrainedExpectedImprovement(
+            self.model, best_f=best_f, objective_index=0, constraints=bounds
+        )
+
+    # Reference point slightly below the worst observed value of each objective
+    Y_obj = Y[:, :n_objectives]
+    spread = Y_obj.max(axis=0) - Y_obj.min(axis=0)
+    ref_point = Y_obj.min(axis=0) - 0.1 * np.where(spread > 0, spread, 1.0)
+    return qNoisyExpectedHypervolumeImprovement(
+        model=self.model,
+        ref_point=ref_point.tolist(),
+        X_baseline=self.X_samples_torch,
+        objective=IdentityMCMultiOutputObjective(outcomes=list(range(n_objectives))),
+        constraints=get_constraint_callables(n_objectives, self.constraints) or None,
+        prune_baseline=True,
+    )
@@ -0,0 +1,541 @@
+# bo_corr_plot/core/engine.py
+
+import re
+import time
+
+import numpy as np
+
+from ..epics.epics_interface import get_objective_value, get_objective_values, set_input_value
+from ..data import mock_data
+from ..data.mock_data import objective_function, mock_outputs
+
+# BoTorch / GPyTorch imports
+import torch
+from botorch.models import SingleTaskGP, SingleTaskMultiFidelityGP
+from botorch.fit import fit_gpytorch_model
+from gpytorch.mlls import ExactMarginalLogLikelihood
+from botorch.acquisition.analytic import ExpectedImprovement, UpperConfidenceBound
+
+# We use propose_location_botorch from bo.py
+from .bo import (
+    propose_location_botorch, get_multifidelity_acquisition,
+    TravelPenalizedAcquisition, order_by_travel, predict_grid,
+    get_multioutput_acquisition, get_feasible_mask, get_pareto_mask,
+    get_settle_likelihood, evaluate_acquisition
+)
+from .trust_region import TrustRegion
+from .store import ObservationStore
+
+
+def parse_objectives(text):
+    """
+    Parse a comma-separated list of objective PVs. A leading "-" marks an
+    objective to minimize. Returns (pvs, signs).
+    """
+    pvs, signs = [], []
+    for item in text.split(","):
+        item = item.strip()
+        if item:
+            signs.append(-1.0 if item.startswith("-") else 1.0)
+            pvs.append(item.lstrip("-").strip())
+    return pvs, signs
+
+
+def parse_constraints(text):
+    """
+    Parse comma-separated constraints of the form "PV<bound" or "PV>bound".
+    Returns (pvs, [(op, bound), ...]).
+    """
+    pvs, constraints = [], []
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        match = re.fullmatch(r"\s*([^<>\s]+)\s*([<>])=?\s*(\S+)\s*", item)
+        if match is None:
+            raise ValueError(f"Invalid constraint '{item.strip()}', expected PV<bound or PV>bound.")
+        pvs.append(match.group(1))
+        constraints.append((match.group(2), float(match.group(3))))
+    return pvs, constraints
+
+
+class BOEngine:
+    """
+    Headless Bayesian optimization loop. It holds the data, model and
+    acquisition state of one run and has no GUI dependency, so it can be
+    driven by the in-process BOController or by the optimization service.
+    `start` and `step` return a result dict describing the run after the
+    initial samples and after each iteration.
+    """
+
+    def __init__(self):
+        self.n_iter = 0
+        self.current_iter = 0
+        self.last_result = None
+        self.initial_input_value = None
+        self.use_mock_data = True
+
+    @property
+    def done(self):
+        return self.current_iter >= self.n_iter
+
+    def start(self, config):
+        """
+        Start a new run and evaluate the initial samples. `config` is a dict with:
+
+        - n_iter, acquisition_function ("ei" or "ucb"), exploration_param
+        - input_pv, objective_pv, wait_time (seconds); objective_pv may list
+          several comma-separated PVs, "-PV" meaning minimize
+        - constraint_pvs: comma-separated "PV<bound" / "PV>bound" constraints
+        - bounds: (min_range, max_range) of the input PV
+        - initial_samples: array of shape (n_init, 1)
+        - initial_input_value: current input PV value, or None
+        - trust_region: restrict proposals to a TuRBO-style trust region
+          around the incumbent that adapts during the run
+        - multi_fidelity, min_settle_fraction: treat the settle time as a
+          fidelity in [min_settle_fraction, 1] * wait_time chosen by a
+          cost-aware acquisition
+        - travel_weight: penalize EI/UCB proposals by their distance from
+          the current input PV setpoint (0 disables the penalty)
+        - dtype ("float32" or "float64"), grid_points: precision and
+          resolution of the model and evaluation grid
+
+        With several objectives or any constraint, all output PVs are read
+        in one bulk call per measurement, a multi-output GP is fitted and
+        proposals use qNEHVI or constrained EI (trust region and
+        multi-fidelity settle are then disabled).
+        """
+        # Parse the output PVs first, so an invalid config leaves the engine untouched
+        objective_pvs, objective_signs = parse_objectives(config["objective_pv"])
+        constraint_pvs, constraints = parse_constraints(config.get("constraint_pvs", ""))
+        if constraints and not objective_pvs:
+            raise ValueError("Constraint PVs need at least one objective PV.")
+
+        self.n_iter = config["n_iter"]
+        self.current_iter = 0
+        self.acquisition_function = config["acquisition_function"]  # "ei" or "ucb"
+        self.exploration_param = config["exploration_param"]
+        self.input_pv = config["input_pv"].strip()
+        self.objective_pvs, self.objective_signs = objective_pvs, objective_signs
+        self.objective_pv = objective_pvs[0] if objective_pvs else ""
+        self.constraints = constraints
+        self.output_pvs = self.objective_pvs + constraint_pvs
+        self.multi_output = len(self.objective_pvs) > 1 or bool(self.constraints)
+        self.wait_time = config["wait_time"]
+        self.multi_fidelity = config.get("multi_fidelity", False) and not self.multi_output
+        self.min_settle_fraction = config.get("min_settle_fraction", 0.2)
+        self.travel_weights = np.array([config.get("travel_weight", 0.0)])  # one weight per input PV
+        dtype = config.get("dtype", "float32")
+        self.dtype = getattr(torch, dtype)
+        self.grid_model = None  # model whose grid prediction is cached
+        self.grid_prediction = None
+        self.acq_fn = None  # acquisition of the current model (without travel penalty), plotted in multi-output mode
+
+        # Determine if we use mock data or real EPICS
+        use_mock_data = not self.input_pv or not self.objective_pvs
+        self.use_mock_data = use_mock_data
+        if use_mock_data:
+            print("Input PV or Objective PV not provided. Using mock data.")
+        else:
+            print(f"Using Input PV: {self.input_pv}, Output PVs: {', '.join(self.output_pvs)}")
+
+        # Bounds
+        min_range, max_range = config["bounds"]
+        print(f"Starting optimization with range: Min = {min_range}, Max = {max_range}")
+        self.bounds = np.array([[min_range, max_range]])
+        use_trust_region = config.get("trust_region", False) and not self.multi_output
+        self.trust_region = TrustRegion(self.bounds) if use_trust_region else None
+
+        # Current actuator setpoint: the input PV's initial value, if known
+        self.initial_input_value = config.get("initial_input_value")
+        if self.initial_input_value is not None and not use_mock_data:
+            self.current_x = np.array([float(self.initial_input_value)])
+        else:
+            self.current_x = self.bounds.mean(axis=1)
+
+        # Initial samples (Latin Hypercube), visited as a short route
+        X_initial = np.asarray(config["initial_samples"], dtype=float).reshape(-1, 1)
+        X_initial = order_by_travel(X_initial, self.current_x)
+        # In multi-fidelity mode, alternate full and shortest settles so the
+        # model and the cost model see both ends of the fidelity range
+        if self.multi_fidelity:
+            F_initial = np.where(np.arange(len(X_initial)) % 2 == 0, 1.0, self.min_settle_fraction)
+        else:
+            F_initial = np.ones(len(X_initial))
+        # Observation store: model inputs are x (plus the settle fraction in
+        # multi-fidelity mode); its buffers are shared by numpy and torch
+        n_inputs = self.bounds.shape[0] + (1 if self.multi_fidelity else 0)
+        self.store = ObservationStore(n_inputs, n_outputs=max(len(self.output_pvs), 1), dtype=dtype)
+        for x_val, fidelity in zip(X_initial, F_initial):
+            # Evaluate objective (EPICS or mock)
+            settle_time = fidelity * self.wait_time
+            y_val, elapsed = self.measure_objective(x_val[0], settle_time)
+            if self.objectives_read(y_val):
+                self.record_sample(x_val[0], fidelity, y_val, settle_time, elapsed)
+        if len(self.store) == 0:
+            self.restore_input()
+            raise ValueError("Could not read the objective PVs at any initial sample.")
+
+        # Create a 1D evaluation grid for plotting (at full settle in multi-fidelity mode)
+        self.X_eval_np = np.linspace(min_range, max_range, config.get("grid_points", 1000)).reshape(-1, 1)
+        if self.multi_fidelity:
+            X_eval_model = np.hstack((self.X_eval_np, np.ones_like(self.X_eval_np)))
+        else:
+            X_eval_model = self.X_eval_np
+        self.X_eval_torch = torch.tensor(X_eval_model, dtype=self.dtype)
+
+        # Fit once so we can show an initial GP (and acquisition)
+        self.fit_botorch_model()
+        if self.multi_output:
+            self.acq_fn = self.get_acquisition_function(travel_penalty=False)
+        message = "Starting optimization..."
+        if use_mock_data:
+            message = "Warning: Missing PVs. Using mock data. " + message
+        if self.multi_output and (config.get("trust_region") or config.get("multi_fidelity")):
+            message += " Trust region and multi-fidelity settle are disabled with several outputs."
+        return self.make_result(message)
+
+    def step(self):
+        """
+        Run one BO iteration and return its result dict.
+        """
+        # 1) Fit the BoTorch model to the current data
+        self.fit_botorch_model()
+
+        # 2) Build the acquisition function; the plot shows it without the
+        # travel penalty, as the single-output EI/UCB curve is
+        acq_fn = self.get_acquisition_function()
+        if isinstance(acq_fn, TravelPenalizedAcquisition):
+            self.acq_fn = acq_fn.acq_fn
+        else:
+            self.acq_fn = acq_fn
+
+        # 3) Propose a new sample (inside the trust region, if enabled)
+        X_next_torch = propose_location_botorch(self, acq_fn, bounds=self.get_search_bounds())
+        X_next = X_next_torch.numpy()
+        x_val = float(X_next[0, 0])
+        fidelity = float(X_next[0, -1]) if self.multi_fidelity else 1.0
+        settle_time = fidelity * self.wait_time
+        noise = self.estimate_noise(X_next_torch)
+
+        # 4) Evaluate the objective at x_val
+        y_val, elapsed = self.measure_objective(x_val, settle_time)
+        if not self.objectives_read(y_val):
+            # Keep the data clean: a failed read is not recorded
+            self.current_iter += 1
+            return self.make_result(
+                f"Iteration {self.current_iter}: could not read the objective PVs, sample skipped."
+            )
+
+        # 5) Update the trust region and data (both np and torch)
+        if self.trust_region is not None:
+            # Only full-settle readings can count as a success or failure
+            if np.isclose(fidelity, 1.0):
+                best_before = float(self.Y_samples[self.get_best_index()][0])
+                self.trust_region.update(y_val, best_before)
+        self.record_sample(x_val, fidelity, y_val, settle_time, elapsed, noise=noise)
+
+        # 6) Find the best (feasible) sampled point so far
+        best_idx = self.get_best_index()
+        best_value = float(self.Y_samples[best_idx][0])
+        best_x = float(self.X_samples[best_idx][0])
+
+        # 7) Find the best predicted point from the model’s mean on a 1D grid
+        mean = self.get_grid_prediction()[0].numpy()
+        if mean.ndim == 2:
+            mean = mean[:, 0]  # primary objective, shape (grid_points,)
+        best_pred_idx = np.argmax(mean)
+        best_pred_val = float(mean[best_pred_idx])
+        best_pred_x = float(self.X_eval_np[best_pred_idx][0])
+
+        self.current_iter += 1
+
+        status = []
+        if self.trust_region is not None:
+            tr_min, tr_max = self.get_trust_bounds()[0]
+            status.append(f"trust region [{tr_min:.4f}, {tr_max:.4f}]")
+        if self.multi_fidelity:
+            fixed_cost, slope = self.settle_cost
+            status.append(
+                f"settle {settle_time:.2f} s (fidelity {fidelity:.2f}, "
+                f"cost model {fixed_cost:.2f} s + {slope:.2f} x settle)"
+            )
+        if status:
+            message = f"Iteration {self.current_iter}: " + ", ".join(status)
+        else:
+            message = f"Completed iteration {self.current_iter}."
+
+        labels = (x_val, best_value, best_x, best_pred_val, best_pred_x)
+        return self.make_result(message, labels=labels)
+
+    def make_result(self, message, labels=None):
+        """
+        Bundle the state of the run for display: samples, grid posterior,
+        trust region, status message and (after an iteration) the values for
+        the GUI labels. Only plain numbers and numpy arrays are included, so
+        the result can be sent to other processes.
+        """
+        mean, std = (values.numpy() for values in self.get_grid_prediction())
+        acquisition = None
+        pareto = None
+        if self.multi_output:
+            # Plot the primary objective and the acquisition the last proposal
+            # was made with (same model as the grid posterior)
+            mean, std = mean[:, 0], std[:, 0]
+            acq_values = evaluate_acquisition(self.acq_fn, self.X_eval_torch).numpy()
+            label = "qNEHVI" if len(self.objective_pvs) > 1 else "Constrained EI"
+            acquisition = (acq_values, label)
+        if len(self.objective_pvs) > 1:
+            n_objectives = len(self.objective_pvs)
+            Y_objectives = self.store.Y[:, :n_objectives]
+            feasible = get_feasible_mask(self.store.Y, n_objectives, self.constraints)
+            # Non-dominated feasible samples over all objectives, and over the
+            # two objectives that are plotted
+            pareto_mask = np.zeros(len(Y_objectives), dtype=bool)
+            front_2d = np.zeros(len(Y_objectives), dtype=bool)
+            if feasible.any():
+                pareto_mask[feasible] = get_pareto_mask(Y_objectives[feasible])
+                front_2d[feasible] = get_pareto_mask(Y_objectives[feasible, :2])
+            names = [("-" if sign < 0 else "") + pv
+                     for pv, sign in zip(self.objective_pvs, self.objective_signs)]
+            pareto = {
+                "Y": Y_objectives, "mask": pareto_mask, "front_2d": front_2d,
+                "feasible": feasible, "names": names
+            }
+        self.last_result = {
+            "iteration": self.current_iter,
+            "n_iter": self.n_iter,
+            "message": message,
+            "labels": labels,
+            "X_eval": self.X_eval_np,
+            "mean": mean,
+            "std": std,
+            "X_samples": self.X_samples,
+            "Y_samples": self.Y_samples,
+            "best_index": self.get_best_index(),
+            "trust_bounds": self.get_trust_bounds(),
+            "acquisition_function": self.acquisition_function,
+            "exploration_param": self.exploration_param,
+            "acquisition": acquisition,
+            "pareto": pareto,
+        }
+        return self.last_result
+
+    def measure_objective(self, x_val, settle_time):
+        """
+        Evaluate the objective at x_val with the given settle time.
+        Returns (y_val, elapsed), where elapsed is the measured wall-clock
+        time of the evaluation in seconds. With several outputs, y_val is a
+        list of all output readings (one bulk read); objectives to minimize
+        are negated, objectives that could not be read are NaN (see
+        objectives_read) and failed constraint reads count as infeasible.
+        """
+        start = time.monotonic()
+        noise_scale = 1.0
+        if self.use_mock_data and self.multi_fidelity:
+            # Simulate the settle so the cost model has something to learn:
+            # wait, and read noisier after a short settle
+            time.sleep(mock_data.access_time + settle_time)
+            settle_fraction = settle_time / self.wait_time if self.wait_time > 0 else 1.0
+            noise_scale = 1.0 / np.sqrt(max(settle_fraction, 1e-3))
+        if self.multi_output:
+            if self.use_mock_data:
+                y_val = mock_outputs(x_val, len(self.output_pvs), noise_scale=noise_scale)
+            else:
+                y_val = get_objective_values(x_val, self.input_pv, self.output_pvs, settle_time)
+            signs = self.objective_signs + [1.0] * len(self.constraints)
+            y_val = self.fill_failed_constraints([sign * value for sign, value in zip(signs, y_val)])
+        else:
+            if self.use_mock_data:
+                y_val = objective_function(x_val, noise_scale=noise_scale)
+            else:
+                y_val = get_objective_value(x_val, self.input_pv, self.objective_pv, settle_time)
+            if self.objective_signs:
+                y_val = self.objective_signs[0] * y_val
+        self.current_x = np.array([x_val])
+        return y_val, time.monotonic() - start
+
+    def objectives_read(self, y_val):
+        """
+        Return True if all objective readings in `y_val` are valid numbers.
+        """
+        objectives = np.atleast_1d(np.asarray(y_val, dtype=float))[:max(len(self.objective_pvs), 1)]
+        return bool(np.isfinite(objectives).all())
+
+    def fill_failed_constraints(self, y_val):
+        """
+        Replace constraint readings that failed (NaN) with a value just past
+        their bound, so the sample counts as infeasible. The margin is the
+        spread of that constraint's recorded readings (or 1).
+        """
+        n_objectives = len(self.objective_pvs)
+        for j, (op, bound) in enumerate(self.constraints):
+            i = n_objectives + j
+            if not np.isnan(y_val[i]):
+                continue
+            recorded = self.store.Y[:, i]
+            margin = float(np.ptp(recorded)) if len(recorded) > 1 else 0.0
+            margin = margin or 1.0
+            y_val[i] = bound + margin if op == "<" else bound - margin
+            print(f"Constraint {self.output_pvs[i]} not read; recording the sample as infeasible.")
+        return y_val
+
+    def restore_input(self):
+        """
+        Set the input PV back to its value before the run (EPICS only).
+        Returns True if it was reset. Call it between measurements, e.g.
+        after an abort.
+        """
+        if self.use_mock_data or self.initial_input_value is None:
+            return False
+        if not set_input_value(self.input_pv, self.initial_input_value):
+            return False
+        self.current_x = np.array([float(self.initial_input_value)])
+        return True
+
+    def get_grid_prediction(self):
+        """
+        Return the (mean, std) of the current model on the evaluation grid,
+        computed once per fitted model and shared by the labels and the plot.
+        """
+        if self.grid_model is not self.model:
+            self.grid_prediction = predict_grid(self.model, self.X_eval_torch)
+            self.grid_model = self.model
+        return self.grid_prediction
+
+    def record_sample(self, x_val, fidelity, y_val, settle_time, elapsed, noise=np.nan):
+        """
+        Append one observation and its metadata to the observation store.
+        """
+        x_model = [x_val, fidelity] if self.multi_fidelity else [x_val]
+        self.store.append(
+            x_model, y_val,
+            timestamp=time.time(), settle_time=settle_time, elapsed=elapsed, noise=noise
+        )
+
+    def estimate_noise(self, X):
+        """
+        Return the model's observation-noise standard deviation at X (in
+        objective units), recorded with the measurement taken there.
+        """
+        with torch.no_grad():
+            latent_var = self.model.posterior(X).variance
+            observed_var = self.model.posterior(X, observation_noise=True).variance
+        noise_var = (observed_var - latent_var)[..., 0]  # primary objective
+        return float(noise_var.clamp_min(0.0).sqrt().mean())
+
+    # Views of the observation store (no copies)
+    @property
+    def X_samples(self):
+        return self.store.X[:, :self.bounds.shape[0]]  # shape (n, 1)
+
+    @property
+    def Y_samples(self):
+        return self.store.Y[:, :1]  # primary objective, shape (n, 1)
+
+    @property
+    def fidelity_samples(self):
+        if self.multi_fidelity:
+            return self.store.X[:, -1:]  # settle fraction, shape (n, 1)
+        return np.ones((len(self.store), 1))
+
+    @property
+    def settle_samples(self):
+        return self.store.meta("settle_time")  # seconds, shape (n,)
+
+    @property
+    def elapsed_samples(self):
+        return self.store.meta("elapsed")  # seconds, shape (n,)
+
+    @property
+    def X_samples_torch(self):
+        return self.store.X_torch
+
+    @property
+    def Y_samples_torch(self):
+        return self.store.Y_torch  # all model outputs, shape (n, m)
+
+    def fit_botorch_model(self):
+        """
+        Build a SingleTaskGP from current data and fit it with MLL. In
+        multi-fidelity mode, a SingleTaskMultiFidelityGP treats the settle
+        fraction (last input) as a data fidelity, so short-settle readings
+        carry a discrepancy that vanishes at full settle, and a SettleNoise
+        likelihood makes them noisier. Both make them less informative
+        about the target.
+        """
+        if self.multi_fidelity:
+            fidelity_col = self.bounds.shape[0]
+            self.model = SingleTaskMultiFidelityGP(
+                self.X_samples_torch, self.Y_samples_torch, data_fidelities=[fidelity_col],
+                likelihood=get_settle_likelihood(fidelity_col)
+            )
+        else:
+            self.model = SingleTaskGP(self.X_samples_torch, self.Y_samples_torch)
+        mll = ExactMarginalLogLikelihood(self.model.likelihood, self.model)
+        fit_gpytorch_model(mll)
+
+    def get_trust_bounds(self):
+        """
+        Return the current trust-region bounds around the best sample,
+        or None if trust-region mode is off.
+        """
+        if self.trust_region is None:
+            return None
+        return self.trust_region.get_bounds(self.X_samples[self.get_best_index()])
+
+    def get_best_index(self):
+        """
+        Return the index of the best sample of the primary objective,
+        among the samples meeting the constraints if any do. In
+        multi-fidelity mode only full-settle samples are candidates (once
+        there are any), so a noisy short-settle reading never becomes the
+        incumbent.
+        """
+        Y = self.Y_samples[:, 0]
+        candidates = get_feasible_mask(self.store.Y, len(self.objective_pvs), self.constraints)
+        if not candidates.any():
+            candidates = np.ones(len(Y), dtype=bool)
+        full_settle = np.isclose(self.fidelity_samples[:, 0], 1.0)
+        if (candidates & full_settle).any():
+            candidates &= full_settle
+        return int(np.flatnonzero(candidates)[np.argmax(Y[candidates])])
+
+    def get_search_bounds(self):
+        """
+        Return the bounds handed to the acquisition optimizer: the trust
+        region (or full range), plus the settle-fidelity range if enabled.
+        """
+        trust_bounds = self.get_trust_bounds()
+        bounds = self.bounds if trust_bounds is None else trust_bounds
+        if self.multi_fidelity:
+            bounds = np.vstack((bounds, [[self.min_settle_fraction, 1.0]]))
+        return bounds
+
+    def get_acquisition_function(self, travel_penalty=True):
+        """
+        Return a BoTorch acquisition function (EI or UCB), the cost-aware
+        multi-fidelity knowledge gradient in multi-fidelity mode, or qNEHVI /
+        constrained EI with several outputs. EI, UCB and constrained EI are
+        wrapped with a travel penalty when any travel weight is set and
+        `travel_penalty` is True. The multi-fidelity acquisition and qNEHVI
+        are left unpenalized: the penalty is in units of the objective, not
+        of information gain or hypervolume.
+        """
+        if self.multi_fidelity:
+            acq_fn = get_multifidelity_acquisition(self)
+        elif self.multi_output:
+            acq_fn = get_multioutput_acquisition(self)
+        elif self.acquisition_function == "ei":
+            # best_f = best observed so far
+            best_f = float(self.Y_samples[self.get_best_index()][0])
+            acq_fn = ExpectedImprovement(self.model, best_f=best_f)
+        else:
+            # UCB with 'beta' ~ exploration_param
+            acq_fn = UpperConfidenceBound(self.model, beta=self.exploration_param)
+        penalize = not self.multi_fidelity and len(self.objective_pvs) <= 1
+        if travel_penalty and penalize and np.any(self.travel_weights > 0):
+            scale = float(self.Y_samples.std()) or 1.0
+            acq_fn = TravelPenalizedAcquisition(
+                acq_fn, self.current_x, self.bounds, self.travel_weights, scale=scale, dtype=self.dtype
+            )
+        return acq_fn
\ No newline at end of file
@@ -0,0 +1,97 @@
+# bo_corr_plot/core/store.py
+import numpy as np
+import torch
+
+
+class ObservationStore:
+    """
+    Growable store of observations: model inputs, objective values and
+    per-sample metadata columns (timestamp, settle time, ...).
+
+    Each block lives in a preallocated NumPy buffer whose capacity doubles
+    when full, so appends are amortized O(1). `X`/`Y`/`meta()` return views
+    of the filled rows and `X_torch`/`Y_torch` wrap the same memory with
+    `torch.from_numpy`, so no copy is made for either library.
+    """
+
+    META_COLUMNS = ("timestamp", "settle_time", "elapsed", "noise")
+
+    def __init__(self, n_inputs, n_outputs=1, meta_columns=META_COLUMNS,
+                 dtype=np.float32, capacity=64):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}.")
+        self.dtype = np.dtype(dtype)
+        self.meta_columns = tuple(meta_columns)
+        self._X = np.empty((capacity, n_inputs), dtype=self.dtype)
+        self._Y = np.empty((capacity, n_outputs), dtype=self.dtype)
+        self._meta = np.full((capacity, len(self.meta_columns)), np.nan)
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def capacity(self):
+        return self._X.shape[0]
+
+    def _reserve(self, n_total):
+        """
+        Grow the buffers (doubling) until they can hold `n_total` rows.
+        Views handed out before a resize keep pointing at the old buffers,
+        which still hold their rows unchanged.
+        """
+        if n_total <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < n_total:
+            capacity *= 2
+        for name in ("_X", "_Y", "_meta"):
+            old = getattr(self, name)
+            new = np.full((capacity, old.shape[1]), np.nan, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def extend(self, X, Y, **meta):
+        """
+        Append a batch of rows. `meta` maps column names to per-row values;
+        missing columns are left as NaN.
+        """
+        X = np.asarray(X, dtype=self.dtype).reshape(-1, self._X.shape[1])
+        Y = np.asarray(Y, dtype=self.dtype).reshape(-1, self._Y.shape[1])
+        n_new = X.shape[0]
+        self._reserve(self.n + n_new)
+        rows = slice(self.n, self.n + n_new)
+        self._X[rows] = X
+        self._Y[rows] = Y
+        self._meta[rows] = np.nan
+        for name, values in meta.items():
+            self._meta[rows, self.meta_columns.index(name)] = values
+        self.n += n_new
+
+    def append(self, x, y, **meta):
+        """
+        Append a single observation.
+        """
+        self.extend(np.reshape(x, (1, -1)), np.reshape(y, (1, -1)), **meta)
+
+    @property
+    def X(self):
+        return self._X[:self.n]
+
+    @property
+    def Y(self):
+        return self._Y[:self.n]
+
+    @property
+    def X_torch(self):
+        return torch.from_numpy(self.X)
+
+    @property
+    def Y_torch(self):
+        return torch.from_numpy(self.Y)
+
+    def meta(self, name):
+        """
+        Return a view of the metadata column `name` for the filled rows.
+        """
+        return self._meta[:self.n, self.meta_columns.index(name)]
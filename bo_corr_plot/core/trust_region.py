@@ -0,0 +1,67 @@
+# bo_corr_plot/core/trust_region.py
+import math
+
+import numpy as np
+
+
+class TrustRegion:
+    """
+    TuRBO-style trust region around the incumbent (best sampled point).
+
+    The region side length is kept in normalized units (fraction of the full
+    search range). It doubles after `success_tolerance` consecutive improvements,
+    halves after `failure_tolerance` consecutive misses, and restarts at
+    `length_init` once it shrinks below `length_min`. Samples are never
+    discarded, so the GP keeps all data across region changes.
+    """
+
+    def __init__(self, bounds, length_init=0.8, length_min=0.5 ** 7, length_max=1.6,
+                 success_tolerance=3, failure_tolerance=None):
+        self.bounds = np.asarray(bounds, dtype=float)  # shape (d, 2)
+        dim = self.bounds.shape[0]
+        self.length_init = length_init
+        self.length_min = length_min
+        self.length_max = length_max
+        self.success_tolerance = success_tolerance
+        self.failure_tolerance = failure_tolerance or max(4, dim)
+        self.length = length_init
+        self.success_counter = 0
+        self.failure_counter = 0
+        self.n_restarts = 0
+
+    def update(self, y_new, best_before):
+        """
+        Update the success/failure counters with a new observation and
+        expand or shrink the region accordingly.
+        """
+        if y_new > best_before + 1e-3 * math.fabs(best_before):
+            self.success_counter += 1
+            self.failure_counter = 0
+        else:
+            self.success_counter = 0
+            self.failure_counter += 1
+
+        if self.success_counter == self.success_tolerance:
+            self.length = min(2.0 * self.length, self.length_max)
+            self.success_counter = 0
+        elif self.failure_counter == self.failure_tolerance:
+            self.length /= 2.0
+            self.failure_counter = 0
+
+        if self.length < self.length_min:
+            # Region collapsed: restart the length but keep the model data
+            self.length = self.length_init
+            self.n_restarts += 1
+
+    def get_bounds(self, center):
+        """
+        Return the trust-region bounds (shape (d, 2)) centered on `center`,
+        clipped to the global search bounds.
+        """
+        lower, upper = self.bounds[:, 0], self.bounds[:, 1]
+        width = upper - lower
+        center = np.asarray(center, dtype=float).reshape(-1)
+        half = 0.5 * self.length * width
+        tr_lower = np.clip(center - half, lower, upper)
+        tr_upper = np.clip(center + half, lower, upper)
+        return np.stack([tr_lower, tr_upper], axis=-1)
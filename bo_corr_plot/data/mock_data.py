@@ -1,8 +1,22 @@
 import numpy as np
 
+# Simulated channel-access round trip (caput + caget) per measurement, in
+# seconds, used in multi-fidelity mode
+access_time = 0.2
+
 # Define the objective function to be optimized
-def objective_function(x):
-    return (x - 0.5)**2 * np.sin(x) + np.cos(2*x) + np.random.normal(0, 5)
+# noise_scale > 1 mimics a reading taken before the machine has fully settled
+def objective_function(x, noise_scale=1.0):
+    return (x - 0.5)**2 * np.sin(x) + np.cos(2*x) + np.random.normal(0, 5 * noise_scale)
+
+# Mock secondary signal (e.g. beam losses), lowest near x = 6
+def loss_function(x, noise_scale=1.0):
+    return 0.5 * (x - 6.0)**2 + np.random.normal(0, noise_scale)
+
+def mock_outputs(x, n_outputs, noise_scale=1.0):
+    """Mock readings for several output PVs: the objective, then losses."""
+    return [objective_function(x, noise_scale)] + \
+        [loss_function(x, noise_scale) for _ in range(n_outputs - 1)]
 
 # Define the search bounds
 bounds = np.array([[-2.0, 10.0]])
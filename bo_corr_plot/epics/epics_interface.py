@@ -1,7 +1,7 @@
 import time
-from epics import caget, caput
+from epics import caget, caget_many, caput
 import numpy as np
-from ..data.mock_data import objective_function
+from ..data.mock_data import objective_function, mock_outputs
 
 
 def get_objective_value(x_value, input_pv, objective_pv, wait_time=3.0):
@@ -27,4 +27,45 @@ def get_objective_value(x_value, input_pv, objective_pv, wait_time=3.0):
         print(f"Input or Objective PV not provided. Falling back to mock data. X: {x_value}")
         y_value = objective_function(x_value)
 
-    return y_value
\ No newline at end of file
+    return y_value
+
+
+def set_input_value(input_pv, value):
+    """
+    Set the input PV to `value`. Returns False if the write failed.
+    """
+    try:
+        caput(input_pv, value)
+    except Exception as e:
+        print(f"EPICS exception: {e}. Could not set {input_pv}.")
+        return False
+    return True
+
+
+def get_objective_values(x_value, input_pv, output_pvs, wait_time=3.0):
+    """
+    Set the input PV once and read all output PVs (objectives and
+    constraints) in one bulk round-trip. Channels that cannot be read are
+    returned as NaN, never as made-up values; without PVs, mock data is
+    returned.
+    """
+    if input_pv and output_pvs:
+        try:
+            caput(input_pv, x_value)  # Set input PV
+            time.sleep(wait_time)  # Wait for the system to stabilize
+            values = caget_many(output_pvs)  # Read all output PVs at once
+        except Exception as e:
+            print(f"EPICS exception: {e}.")
+            return [np.nan] * len(output_pvs)
+
+        y_values = []
+        for pv, value in zip(output_pvs, values):
+            if value is None or np.isnan(value):
+                print(f"EPICS failed to read {pv}.")
+                value = np.nan
+            y_values.append(value)
+        print(f"Using EPICS PVs. X: {x_value}, Y: {y_values}")
+        return y_values
+
+    print(f"Input or Objective PVs not provided. Falling back to mock data. X: {x_value}")
+    return mock_outputs(x_value, len(output_pvs))
@@ -1,6 +1,6 @@
 from PyQt5.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-    QComboBox, QPushButton, QDoubleSpinBox
+    QComboBox, QPushButton, QDoubleSpinBox, QCheckBox, QSpinBox
 )
 from PyQt5.QtCore import Qt
 from .param_widget import ParameterWidget
@@ -21,10 +21,33 @@ def create_main_layout(main_window):
     pv_layout.addWidget(input_pv_label)
     pv_layout.addWidget(main_window.input_pv_edit)
 
+    travel_label = QLabel("Travel Penalty:")
+    main_window.travel_spin = QDoubleSpinBox()
+    main_window.travel_spin.setRange(0.0, 10.0)
+    main_window.travel_spin.setValue(0.0)  # Default: no penalty
+    main_window.travel_spin.setSingleStep(0.1)
+    main_window.travel_spin.setToolTip(
+        "Penalize proposals far from the current Input PV setpoint. "
+        "1.0 means a full-range move costs one standard deviation of the objective."
+    )
+    pv_layout.addWidget(travel_label)
+    pv_layout.addWidget(main_window.travel_spin)
+
     objective_pv_label = QLabel("Objective PV:")
     main_window.objective_pv_edit = QLineEdit("")
+    main_window.objective_pv_edit.setToolTip(
+        "One or more comma-separated PVs; prefix a PV with '-' to minimize it."
+    )
     pv_layout.addWidget(objective_pv_label)
     pv_layout.addWidget(main_window.objective_pv_edit)
+
+    constraint_pv_label = QLabel("Constraint PVs:")
+    main_window.constraint_pv_edit = QLineEdit("")
+    main_window.constraint_pv_edit.setToolTip(
+        "Optional comma-separated constraints such as 'PV<1.5' or 'PV>0.2'."
+    )
+    pv_layout.addWidget(constraint_pv_label)
+    pv_layout.addWidget(main_window.constraint_pv_edit)
     main_layout.addLayout(pv_layout)
 
     # Second Line: Initial value, Min, Max, %, Wait Time
@@ -61,6 +84,20 @@ def create_main_layout(main_window):
     control_layout.addWidget(wait_label)
     control_layout.addWidget(main_window.wait_spin)
 
+    main_window.multi_fidelity_check = QCheckBox("Multi-Fidelity Settle")
+    main_window.multi_fidelity_check.setToolTip(
+        "Treat the settle time as a fidelity and let a cost-aware acquisition choose shorter settles."
+    )
+    control_layout.addWidget(main_window.multi_fidelity_check)
+
+    min_settle_label = QLabel("Min Settle (%):")
+    main_window.min_settle_spin = QDoubleSpinBox()
+    main_window.min_settle_spin.setRange(1.0, 100.0)
+    main_window.min_settle_spin.setValue(20.0)  # Default to 20% of the wait time
+    main_window.min_settle_spin.setSingleStep(5.0)
+    control_layout.addWidget(min_settle_label)
+    control_layout.addWidget(main_window.min_settle_spin)
+
     main_layout.addLayout(control_layout)
     
     
@@ -89,6 +126,26 @@ def create_main_layout(main_window):
     settings_layout.addWidget(expl_label)
     settings_layout.addWidget(main_window.expl_spin)
 
+    main_window.trust_region_check = QCheckBox("Trust Region")
+    main_window.trust_region_check.setToolTip(
+        "Adapt the search bounds around the best sample during the run (TuRBO-style)."
+    )
+    settings_layout.addWidget(main_window.trust_region_check)
+
+    dtype_label = QLabel("Precision:")
+    main_window.dtype_combo = QComboBox()
+    main_window.dtype_combo.addItems(["float32", "float64"])
+    settings_layout.addWidget(dtype_label)
+    settings_layout.addWidget(main_window.dtype_combo)
+
+    grid_label = QLabel("Grid Points:")
+    main_window.grid_spin = QSpinBox()
+    main_window.grid_spin.setRange(100, 100000)
+    main_window.grid_spin.setValue(1000)
+    main_window.grid_spin.setSingleStep(500)
+    settings_layout.addWidget(grid_label)
+    settings_layout.addWidget(main_window.grid_spin)
+
     # Info Dialog Button
     help_button = QPushButton("?")
     help_button.setFixedWidth(30)
@@ -27,7 +27,13 @@ class InfoDialog(QDialog):
             "but can vary depending on the problem.<br><br>"
             
             "Adjusting these parameters helps control how aggressively the optimizer searches for "
-            "new, potentially better areas (exploration) versus refining known good areas (exploitation)."
+            "new, potentially better areas (exploration) versus refining known good areas (exploitation).<br><br>"
+
+            "<b>Multi-Fidelity Settle:</b><br>"
+            "When enabled, the settle time is treated as a fidelity between Min Settle and the full wait time. "
+            "A cost-aware knowledge-gradient acquisition, weighted by a cost model fitted to the measured "
+            "evaluation times, decides when a short, noisier settle is enough. EI/UCB settings are then "
+            "only used for the plot."
         )
 
         label = QLabel(info_text)
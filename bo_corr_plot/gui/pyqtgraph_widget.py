@@ -4,7 +4,8 @@ from pyqtgraph.Qt import QtCore
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout
 import numpy as np
 import torch
-from botorch.acquisition.analytic import ExpectedImprovement, UpperConfidenceBound
+
+from ..core.bo import predict_grid, grid_acquisition
 
 
 class PyQtGraphWidget(QWidget):
@@ -48,6 +49,17 @@ class PyQtGraphWidget(QWidget):
         self.bottom_plot.enableAutoRange('xy', True)
         self.bottom_plot.addLegend(offset=(10,10))
 
+        # Pareto front plot, only added to the layout in multi-objective runs
+        self.pareto_plot = pg.PlotItem(title="Pareto Front")
+        self.pareto_plot.showGrid(x=True, y=True)
+        self.pareto_plot.setTitle("Pareto Front", color='w')
+        self.pareto_plot.getAxis('left').setPen('w')
+        self.pareto_plot.getAxis('left').setTextPen('w')
+        self.pareto_plot.getAxis('bottom').setPen('w')
+        self.pareto_plot.getAxis('bottom').setTextPen('w')
+        self.pareto_plot.addLegend(offset=(10,10))
+        self.pareto_shown = False
+
         # Crosshair lines
         self.vLine = pg.InfiniteLine(angle=90, movable=False, pen=pg.mkPen('w', style=QtCore.Qt.DashLine))
         self.hLine = pg.InfiniteLine(angle=0, movable=False, pen=pg.mkPen('w', style=QtCore.Qt.DashLine))
@@ -70,20 +82,100 @@ class PyQtGraphWidget(QWidget):
         self.top_plot.addItem(self.vLine, ignoreBounds=True)
         self.top_plot.addItem(self.hLine, ignoreBounds=True)
 
+    def update_plot_result(self, result):
+        """
+        Update the plots from a BOEngine result dict (in-process or streamed
+        from the optimization service).
+        """
+        self.update_plot_botorch(
+            None,
+            result["X_eval"],
+            None,
+            result["X_samples"],
+            result["Y_samples"],
+            iteration=result["iteration"],
+            acquisition_function=result["acquisition_function"],
+            exploration_param=result["exploration_param"],
+            trust_bounds=result["trust_bounds"],
+            prediction=(result["mean"], result["std"]),
+            acquisition=result.get("acquisition"),
+            best_index=result.get("best_index")
+        )
+        self.update_pareto(result.get("pareto"))
+
+    def update_pareto(self, pareto):
+        """
+        Show the objective values of all samples, the Pareto-optimal samples
+        (over all objectives) and the Pareto front of the two plotted
+        objectives, or hide the Pareto plot if `pareto` is None.
+        """
+        if pareto is None:
+            if self.pareto_shown:
+                self.layout_widget.removeItem(self.pareto_plot)
+                self.pareto_shown = False
+            return
+        if not self.pareto_shown:
+            self.layout_widget.addItem(self.pareto_plot, row=0, col=1, rowspan=2)
+            self.pareto_shown = True
+
+        self.pareto_plot.clear()
+        Y, mask, feasible = pareto["Y"], pareto["mask"], pareto["feasible"]
+        name_x, name_y = pareto["names"][:2]
+        self.pareto_plot.getAxis('bottom').setLabel(name_x, color='w')
+        self.pareto_plot.getAxis('left').setLabel(name_y, color='w')
+
+        self.pareto_plot.plot(
+            Y[feasible, 0], Y[feasible, 1],
+            pen=None, symbol='o', symbolPen=None,
+            symbolSize=6, symbolBrush='r',
+            name='Feasible Samples'
+        )
+        if (~feasible).any():
+            self.pareto_plot.plot(
+                Y[~feasible, 0], Y[~feasible, 1],
+                pen=None, symbol='x', symbolPen=None,
+                symbolSize=6, symbolBrush=(150, 150, 150),
+                name='Infeasible Samples'
+            )
+        # Line through the front of the first two objectives only: with more
+        # objectives, the N-D Pareto points need not lie on it
+        front = Y[pareto["front_2d"]][:, :2]
+        front = front[np.argsort(front[:, 0])]
+        self.pareto_plot.plot(
+            front[:, 0], front[:, 1],
+            pen=pg.mkPen('lime', width=2), name='Pareto Front'
+        )
+        self.pareto_plot.plot(
+            Y[mask, 0], Y[mask, 1],
+            pen=None, symbol='star', symbolPen=None, symbolSize=10, symbolBrush='g',
+            name='Pareto-Optimal Samples'
+        )
+        self.pareto_plot.enableAutoRange('xy', True)
+
     def update_plot_botorch(self, model, X_np, X_torch, X_samples, Y_samples,
-                            iteration, acquisition_function, exploration_param):
+                            iteration, acquisition_function, exploration_param,
+                            trust_bounds=None, prediction=None, acquisition=None,
+                            best_index=None):
         """
         Update the top/bottom plots using the BoTorch model's posterior
-        and built-in acquisition functions (EI or UCB).
+        and analytic acquisition functions (EI or UCB).
+        If `trust_bounds` is given, the trust region is shaded on both plots.
+        `prediction` is an optional precomputed (mean, std) pair of tensors or
+        arrays on X_torch, so the posterior is not evaluated twice for the same
+        model; with it, `model` and `X_torch` are not needed. For a
+        multi-output model the first output is plotted. `acquisition` is an
+        optional precomputed (values, label) pair replacing the EI/UCB curve.
+        `best_index` is the engine's incumbent (default: the largest sample).
         """
         self.clear_plots()
 
-        # Convert to torch
-        model.eval()
-        with torch.no_grad():
-            posterior = model(X_torch)  # shape: (N_eval, 1)
-            mean = posterior.mean.view(-1).detach().numpy()
-            std = posterior.variance.sqrt().view(-1).detach().numpy()
+        if prediction is None:
+            prediction = predict_grid(model, X_torch)
+        mean_torch, std_torch = (torch.as_tensor(values) for values in prediction)
+        if mean_torch.dim() == 2:
+            mean_torch, std_torch = mean_torch[:, 0], std_torch[:, 0]
+        mean = mean_torch.double().numpy()
+        std = std_torch.double().numpy()
 
         # Sort by X for nice plotting
         sort_idx = np.argsort(X_np.flatten())
@@ -95,22 +187,23 @@ class PyQtGraphWidget(QWidget):
         lower = mean_sorted - 1.96 * std_sorted
 
         # Best sample
-        best_idx = Y_samples.argmax()
+        best_idx = Y_samples.argmax() if best_index is None else best_index
         best_x = X_samples[best_idx][0]
         best_y = Y_samples[best_idx][0]
 
-        # Build an acquisition function instance for the bottom plot
-        if acquisition_function == "ei":
-            best_f = float(Y_samples.max())
-            acq_fn = ExpectedImprovement(model, best_f=best_f)
-            label_str = f"EI (best_f={best_f:.3f}, xi~0)"
+        # Evaluate the acquisition for the bottom plot from the same posterior
+        best_f = float(best_y)
+        if acquisition is not None:
+            acq_values, label_str = acquisition
+            acq_values = np.asarray(acq_values, dtype=float).reshape(-1)
         else:
-            acq_fn = UpperConfidenceBound(model, beta=exploration_param)
-            label_str = f"UCB (beta={exploration_param:.3f})"
-
-        # Fix shape of X_torch for the acquisition function
-        with torch.no_grad():
-            acq_values = acq_fn(X_torch.unsqueeze(-2)).view(-1).detach().numpy()
+            if acquisition_function == "ei":
+                label_str = f"EI (best_f={best_f:.3f}, xi~0)"
+            else:
+                label_str = f"UCB (beta={exploration_param:.3f})"
+            acq_values = grid_acquisition(
+                mean_torch, std_torch, best_f, float(exploration_param), acquisition_function == "ei"
+            ).double().numpy()
         acq_values_sorted = acq_values[sort_idx]
 
         self.top_plot.setTitle(f"Iteration {iteration}: BoTorch GP + Samples", color='w')
@@ -153,6 +246,16 @@ class PyQtGraphWidget(QWidget):
             name=label_str
         )
 
+        # Trust region
+        if trust_bounds is not None:
+            tr_min, tr_max = trust_bounds[0]
+            for plot in (self.top_plot, self.bottom_plot):
+                region = pg.LinearRegionItem(
+                    values=(tr_min, tr_max), movable=False,
+                    brush=(255, 165, 0, 40), pen=pg.mkPen((255, 165, 0, 120))
+                )
+                plot.addItem(region, ignoreBounds=True)
+
         # Auto-range
         self.top_plot.enableAutoRange('xy', True)
         self.bottom_plot.enableAutoRange('xy', True)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import QWidget
-from epics import caget, caput  # Import epics for PV handling
+from epics import caget  # Import epics for PV handling
 from .dialogs import InfoDialog
 from .components import create_main_layout
 
@@ -40,14 +40,11 @@ class MainWindow(QWidget):
 
     def abort_clicked(self):
         """
-        Abort the optimization process and reset the Input PV to its initial value.
+        Abort the optimization process. The controller resets the Input PV to
+        its initial value once no measurement is in flight.
         """
         if self.abort_callback:
             self.abort_callback()
-        if self.initial_input_value is not None:
-            input_pv = self.input_pv_edit.text().strip()
-            caput(input_pv, self.initial_input_value)
-            self.update_message("Optimization aborted and input PV reset to its initial value.")
 
     def update_param_range(self):
         """
@@ -68,12 +65,22 @@ class MainWindow(QWidget):
         """
         input_pv = self.input_pv_edit.text().strip()
         objective_pv = self.objective_pv_edit.text().strip()
+        constraint_pvs = self.constraint_pv_edit.text().strip()
         wait_time = self.wait_spin.value()
         n_iter = int(self.iter_edit.text())
         acquisition = self.acq_combo.currentText().lower()
         exploration_param = self.expl_spin.value()
+        trust_region = self.trust_region_check.isChecked()
+        multi_fidelity = self.multi_fidelity_check.isChecked()
+        min_settle_fraction = self.min_settle_spin.value() / 100.0
+        travel_weight = self.travel_spin.value()
+        dtype = self.dtype_combo.currentText()
+        grid_points = self.grid_spin.value()
 
-        self.start_callback(n_iter, acquisition, self, exploration_param, input_pv, objective_pv, wait_time)
+        self.start_callback(n_iter, acquisition, self, exploration_param, input_pv, objective_pv, wait_time,
+                            trust_region=trust_region, multi_fidelity=multi_fidelity,
+                            min_settle_fraction=min_settle_fraction, travel_weight=travel_weight,
+                            dtype=dtype, grid_points=grid_points, constraint_pvs=constraint_pvs)
 
     def update_labels(self, current_x, best_value, best_x, best_pred_val, best_pred_x):
         """
@@ -0,0 +1 @@
+# For optimization service submodule
\ No newline at end of file
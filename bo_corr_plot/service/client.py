@@ -0,0 +1,80 @@
+# bo_corr_plot/service/client.py
+from multiprocessing.connection import AuthenticationError, Client
+
+from .protocol import (
+    DEFAULT_ADDRESS, authenticate_service, get_authkey_path, parse_address, read_authkey
+)
+
+
+class ServiceClient:
+    """
+    Client for the optimization service. Requests go over a command
+    connection; `subscribe` opens a second connection that receives the
+    stream of results and state changes, drained with `poll_events`.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, read_only=False):
+        self.address, self.family = parse_address(address)
+        self.read_only = read_only
+        # Read-only clients only need (and use) the view key
+        role = "view" if read_only else "control"
+        self.authkey = read_authkey(get_authkey_path(self.address, self.family, role))
+        self.conn = self.connect(stream=False)
+        self.stream = None
+
+    def connect(self, stream):
+        conn = Client(self.address, family=self.family)
+        try:
+            authenticate_service(conn, self.authkey)
+        except (AuthenticationError, EOFError, OSError):
+            conn.close()
+            raise
+        conn.send({"cmd": "attach", "read_only": self.read_only, "stream": stream})
+        return conn
+
+    def request(self, message):
+        """
+        Send a request and return the reply. Raises RuntimeError if the
+        service rejects it, and EOFError/OSError if the connection is lost.
+        """
+        self.conn.send(message)
+        reply = self.conn.recv()
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply
+
+    def start(self, config):
+        return self.request({"cmd": "start", "config": config})
+
+    def abort(self):
+        return self.request({"cmd": "abort"})
+
+    def status(self):
+        return self.request({"cmd": "status"})["status"]
+
+    def subscribe(self):
+        if self.stream is None:
+            self.stream = self.connect(stream=True)
+
+    def poll_events(self):
+        """
+        Return all events received on the stream so far, without blocking.
+        A lost connection ends the stream with a "disconnected" state event.
+        """
+        events = []
+        try:
+            while self.stream is not None and self.stream.poll():
+                events.append(self.stream.recv())
+        except (EOFError, OSError):
+            self.stream.close()
+            self.stream = None
+            events.append({
+                "event": "state", "state": "disconnected",
+                "message": "Error: lost connection to the optimization service."
+            })
+        return events
+
+    def close(self):
+        self.conn.close()
+        if self.stream is not None:
+            self.stream.close()
@@ -0,0 +1,140 @@
+# bo_corr_plot/service/protocol.py
+#
+# Messages are pickled dicts sent over multiprocessing.connection.
+#
+# Every connection first authenticates (see authenticate_client), then sends
+# {"cmd": "attach", "read_only": bool, "stream": bool}.
+# A command connection ("stream": False) then sends requests and gets one reply each:
+#   {"cmd": "start", "config": {...}}  -> {"ok": True}
+#   {"cmd": "abort"}                   -> {"ok": True}
+#   {"cmd": "status"}                  -> {"ok": True, "status": {...}}
+# Failed requests reply {"ok": False, "error": str}. Read-only clients may only ask
+# for the status; clients that authenticated with the view key are always read-only.
+# A stream connection ("stream": True) only receives events from the service:
+#   {"event": "result", "result": {...}}             one per BOEngine start/step
+#   {"event": "state", "state": str, "message": str}  idle/running/complete/aborted/error
+#
+# Connections are authenticated with one of two random keys that the service
+# writes next to its socket (see get_authkey_path): the control key, readable
+# only by the service's user, and the view key, also readable by its group,
+# which only allows watching. TCP addresses are restricted to loopback, since
+# a client can make the service unpickle data.
+import hashlib
+import hmac
+import ipaddress
+import os
+import socket
+from multiprocessing.connection import AuthenticationError
+
+ROLES = ("control", "view")
+KEY_MODES = {"control": 0o600, "view": 0o640}
+CHALLENGE_SIZE = 32
+
+
+def get_runtime_dir(create=False):
+    """
+    Return the per-user directory holding the service socket and authkeys:
+    $XDG_RUNTIME_DIR/bo_corr_plot, or ~/.bo_corr_plot. `create` makes it
+    (mode 0700) if needed.
+    """
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    path = os.path.join(base, "bo_corr_plot") if base else os.path.expanduser("~/.bo_corr_plot")
+    if create:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
+
+
+if hasattr(socket, "AF_UNIX"):
+    DEFAULT_ADDRESS = os.path.join(get_runtime_dir(), "service.sock")
+else:
+    DEFAULT_ADDRESS = "localhost:6789"
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address):
+    """
+    Return (address, family) for multiprocessing.connection: "host:port"
+    is a TCP address, anything else a Unix socket path. The service drives
+    the machine, so only loopback hosts are accepted (ValueError otherwise).
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        host = host.strip("[]") or "localhost"
+        if not is_loopback(host):
+            raise ValueError(f"Refusing non-loopback service address '{address}'.")
+        return (host, int(port)), "AF_INET"
+    return address, "AF_UNIX"
+
+
+def get_authkey_path(address, family, role="control"):
+    """
+    Return the `role` ("control" or "view") authkey file of the service at
+    `address`: next to its Unix socket, or in the runtime directory for a
+    TCP port.
+    """
+    suffix = ".key" if role == "control" else ".view.key"
+    if family == "AF_UNIX":
+        return address + suffix
+    return os.path.join(get_runtime_dir(create=True), f"tcp-{address[1]}{suffix}")
+
+
+def create_authkey(path, mode=0o600):
+    """
+    Write a new random authkey to `path` with permissions `mode`.
+    """
+    authkey = os.urandom(32)
+    if os.path.exists(path):
+        os.unlink(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+    os.fchmod(fd, mode)  # not narrowed by the umask
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+    return authkey
+
+
+def read_authkey(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _digest(authkey, message):
+    return hmac.new(authkey, message, hashlib.sha256).digest()
+
+
+def authenticate_client(conn, authkeys):
+    """
+    Server side of the handshake: challenge the client, find which of
+    `authkeys` ({role: key}) it holds, then answer the client's challenge
+    with that key. Returns the role. Only raw bytes are exchanged, so
+    nothing is unpickled before the client is authenticated.
+    """
+    challenge = os.urandom(CHALLENGE_SIZE)
+    conn.send_bytes(challenge)
+    response = conn.recv_bytes(256)
+    for role, authkey in authkeys.items():
+        if hmac.compare_digest(response, _digest(authkey, challenge)):
+            break
+    else:
+        raise AuthenticationError("digest received was wrong")
+    conn.send_bytes(_digest(authkey, conn.recv_bytes(CHALLENGE_SIZE)))
+    return role
+
+
+def authenticate_service(conn, authkey):
+    """
+    Client side of the handshake: answer the service's challenge, then check
+    that the service holds the same key.
+    """
+    conn.send_bytes(_digest(authkey, conn.recv_bytes(CHALLENGE_SIZE)))
+    challenge = os.urandom(CHALLENGE_SIZE)
+    conn.send_bytes(challenge)
+    if not hmac.compare_digest(conn.recv_bytes(256), _digest(authkey, challenge)):
+        raise AuthenticationError("service failed to authenticate")
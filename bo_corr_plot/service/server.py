@@ -0,0 +1,265 @@
+# bo_corr_plot/service/server.py
+import argparse
+import os
+import queue
+import socket
+import sys
+import threading
+from multiprocessing.connection import Listener, AuthenticationError
+
+from ..core.engine import BOEngine
+from .protocol import (
+    DEFAULT_ADDRESS, KEY_MODES, authenticate_client, create_authkey, get_authkey_path,
+    get_runtime_dir, parse_address
+)
+
+
+class Subscriber:
+    """
+    Stream connection with its own send queue and sender thread, so a slow
+    client never blocks the run. A client that falls `max_pending` events
+    behind is dropped.
+    """
+
+    def __init__(self, conn, max_pending=64):
+        self.conn = conn
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.closed = False
+        threading.Thread(target=self.send_loop, daemon=True).start()
+
+    def put(self, event):
+        """
+        Queue an event without blocking. Returns False if the subscriber is
+        gone or too far behind.
+        """
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.close()
+            return False
+        return True
+
+    def send_loop(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                break
+            try:
+                self.conn.send(event)
+            except (EOFError, OSError):
+                break
+        self.closed = True
+        self.conn.close()
+
+    def close(self):
+        self.closed = True
+        # Wake the sender; it closes the connection
+        while True:
+            try:
+                self.queue.put_nowait(None)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class OptimizationService:
+    """
+    Run a BOEngine in its own process and thread, controlled and watched by
+    any number of clients. Control clients can start and abort runs;
+    read-only clients can only query the status and stream the results.
+    Clients holding only the view key are always read-only.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self.address, self.family = parse_address(address)
+        self.engine = BOEngine()
+        self.state = "idle"
+        self.message = "Ready"
+        self.abort_event = threading.Event()
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def serve_forever(self):
+        """
+        Accept client connections until the process is stopped.
+        """
+        if self.family == "AF_UNIX":
+            if os.path.dirname(self.address) == get_runtime_dir():
+                get_runtime_dir(create=True)
+            self.remove_stale_socket()
+        authkeys = {
+            role: create_authkey(get_authkey_path(self.address, self.family, role), mode)
+            for role, mode in KEY_MODES.items()
+        }
+        # Clients authenticate in their own thread (handle_connection), with
+        # the key deciding their role
+        with Listener(self.address, family=self.family) as listener:
+            print(f"Optimization service listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except OSError as e:
+                    print(f"Rejected client connection: {e}")
+                    continue
+                threading.Thread(
+                    target=self.handle_connection, args=(conn, authkeys), daemon=True
+                ).start()
+
+    def remove_stale_socket(self):
+        """
+        Remove the socket file left by a service that is no longer running.
+        Raises RuntimeError if a service is still listening on it.
+        """
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.address)
+        except (ConnectionRefusedError, FileNotFoundError):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            return
+        finally:
+            probe.close()
+        raise RuntimeError(f"An optimization service is already running on {self.address}.")
+
+    def handle_connection(self, conn, authkeys):
+        """
+        Authenticate one client, then register it as a stream subscriber, or
+        answer its requests on a command connection until it disconnects.
+        """
+        try:
+            role = authenticate_client(conn, authkeys)
+            hello = conn.recv()
+        except AuthenticationError as e:
+            print(f"Rejected client connection: {e}")
+            conn.close()
+            return
+        except (EOFError, OSError):
+            conn.close()
+            return
+        if not isinstance(hello, dict):
+            conn.close()
+            return
+        read_only = role != "control" or hello.get("read_only", True)
+
+        if hello.get("stream"):
+            subscriber = Subscriber(conn)
+            with self.lock:
+                self.subscribers.append(subscriber)
+                # Late joiners get the current state and the latest result
+                subscriber.put({"event": "state", "state": self.state, "message": self.message})
+                if self.engine.last_result is not None:
+                    subscriber.put({"event": "result", "result": self.engine.last_result})
+            return
+
+        while True:
+            try:
+                request = conn.recv()
+                conn.send(self.handle_request(request, read_only))
+            except (EOFError, OSError):
+                break
+        conn.close()
+
+    def handle_request(self, request, read_only):
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Malformed request."}
+        cmd = request.get("cmd")
+        if cmd == "status":
+            return {"ok": True, "status": self.status()}
+        if cmd in ("start", "abort") and read_only:
+            return {"ok": False, "error": "Read-only client cannot control the optimization."}
+        if cmd == "start":
+            config = request.get("config")
+            if not isinstance(config, dict):
+                return {"ok": False, "error": "Start request without a config."}
+            return self.start(config)
+        if cmd == "abort":
+            self.abort_event.set()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown command: {cmd}"}
+
+    def start(self, config):
+        """
+        Start a run in a worker thread, unless one is already running.
+        """
+        with self.lock:
+            if self.state == "running":
+                return {"ok": False, "error": "An optimization is already running."}
+            self.abort_event.clear()
+            self.set_state("running", "Starting optimization...")
+        threading.Thread(target=self.run, args=(config,), daemon=True).start()
+        return {"ok": True}
+
+    def run(self, config):
+        """
+        Drive the engine until it is done or aborted, publishing every result.
+        An abort takes effect after the current measurement, and then resets
+        the input PV to its initial value.
+        """
+        try:
+            self.publish({"event": "result", "result": self.engine.start(config)})
+            while not self.engine.done and not self.abort_event.is_set():
+                self.publish({"event": "result", "result": self.engine.step()})
+            if self.abort_event.is_set():
+                state, message = "aborted", "Optimization aborted."
+                if self.engine.restore_input():
+                    message = "Optimization aborted and input PV reset to its initial value."
+            else:
+                state, message = "complete", "Optimization complete!"
+        except Exception as e:
+            print(f"Optimization failed: {e}")
+            state, message = "error", f"Optimization failed: {e}"
+            try:
+                if self.engine.restore_input():
+                    message += " Input PV reset to its initial value."
+            except Exception as restore_error:
+                print(f"Could not reset the input PV: {restore_error}")
+        with self.lock:
+            self.set_state(state, message)
+
+    def status(self):
+        return {
+            "state": self.state,
+            "message": self.message,
+            "iteration": self.engine.current_iter,
+            "n_iter": self.engine.n_iter,
+            "n_subscribers": len(self.subscribers),
+        }
+
+    def set_state(self, state, message):
+        # Caller holds self.lock
+        self.state = state
+        self.message = message
+        self.broadcast({"event": "state", "state": state, "message": message})
+
+    def publish(self, event):
+        with self.lock:
+            self.broadcast(event)
+
+    def broadcast(self, event):
+        # Caller holds self.lock; queueing never blocks, and subscribers that
+        # went away or fell behind are dropped
+        self.subscribers = [s for s in self.subscribers if s.put(event)]
+
+
+def main():
+    """Run the optimization service."""
+    parser = argparse.ArgumentParser(description="Bayesian optimization service for bae clients.")
+    parser.add_argument(
+        "--address", default=DEFAULT_ADDRESS,
+        help=f"Unix socket path or loopback host:port to listen on (default: {DEFAULT_ADDRESS})"
+    )
+    args = parser.parse_args()
+    try:
+        service = OptimizationService(args.address)
+        service.serve_forever()
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()